@@ -32,6 +32,11 @@ class Config(RepresentationMixin):
     checkpoint_period : str, optional
         Time interval (in "HH:MM:SS") at which to checkpoint completed tasks. Only has an effect if
         ``checkpoint_mode='periodic'``.
+    depth_priority : bool, optional
+        Prioritize tasks on a :class:`~parsl.executors.HighThroughputExecutor` by their depth in the
+        task graph, so that tasks further down an already started chain of dependencies are dispatched
+        before new chains are started. Tasks which set a ``priority`` in their
+        ``parsl_resource_specification`` keep it. Default is False.
     garbage_collect : bool. optional.
         Delete task records from DFK when tasks have completed. Default: True
     internal_tasks_max_threads : int, optional
@@ -74,6 +79,7 @@ class Config(RepresentationMixin):
                  checkpoint_files: Optional[List[str]] = None,
                  checkpoint_mode: Optional[str] = None,
                  checkpoint_period: Optional[str] = None,
+                 depth_priority: bool = False,
                  garbage_collect: bool = True,
                  internal_tasks_max_threads: int = 10,
                  retries: int = 0,
@@ -102,6 +108,7 @@ class Config(RepresentationMixin):
         if checkpoint_mode == 'periodic' and checkpoint_period is None:
             checkpoint_period = "00:30:00"
         self.checkpoint_period = checkpoint_period
+        self.depth_priority = depth_priority
         self.garbage_collect = garbage_collect
         self.internal_tasks_max_threads = internal_tasks_max_threads
         self.retries = retries
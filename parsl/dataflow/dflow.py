@@ -30,6 +30,7 @@ from parsl.dataflow.memoization import Memoizer
 from parsl.dataflow.rundirs import make_rundir
 from parsl.dataflow.states import States, FINAL_STATES, FINAL_FAILURE_STATES
 from parsl.dataflow.usage_tracking.usage import UsageTracker
+from parsl.executors import HighThroughputExecutor
 from parsl.executors.threads import ThreadPoolExecutor
 from parsl.providers.provider_base import JobStatus, JobState
 from parsl.utils import get_version, get_std_fname_mode, get_all_checkpoints
@@ -575,6 +576,8 @@ class DataFlowKernel(object):
         """
         task_id = task_record['id']
         task_record['try_time_launched'] = datetime.datetime.now()
+        # Dependencies have all launched by now, so their depth is known
+        task_record['depth'] = self._task_depth(task_record['depends'])
 
         memo_fu = self.memoizer.check_memo(task_record)
         if memo_fu:
@@ -601,8 +604,13 @@ class DataFlowKernel(object):
                                                          self.monitoring.resource_monitoring_interval,
                                                          executor.monitor_resources())
 
+        resource_specification = task_record['resource_specification']
+        if (self._config.depth_priority and isinstance(executor, HighThroughputExecutor) and
+                'priority' not in resource_specification):
+            resource_specification = dict(resource_specification, priority=task_record['depth'])
+
         with self.submitter_lock:
-            exec_fu = executor.submit(executable, task_record['resource_specification'], *args, **kwargs)
+            exec_fu = executor.submit(executable, resource_specification, *args, **kwargs)
         task_record['status'] = States.launched
 
         self._send_task_log_info(task_record)
@@ -779,6 +787,22 @@ class DataFlowKernel(object):
 
         return new_args, kwargs, dep_failures
 
+    @staticmethod
+    def _task_depth(depends):
+        """Return the depth of a task in the task graph, given its dependencies.
+
+        Tasks without app dependencies have depth 0, other tasks are one deeper
+        than their deepest app dependency. Dependencies which never launched,
+        such as tasks from a previous run, count as depth 0.
+        """
+        depth = 0
+        for d in depends:
+            if isinstance(d, DataFuture):
+                d = d.parent
+            if isinstance(d, AppFuture):
+                depth = max(depth, d.task_def.get('depth', 0) + 1)
+        return depth
+
     def submit(self, func, app_args, executors='all', cache=False, ignore_for_cache=None, app_kwargs={}, join=False):
         """Add task to the dataflow system.
 
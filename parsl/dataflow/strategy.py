@@ -167,7 +167,9 @@ class Strategy(object):
         tasks evenly across blocks, which makes it rather difficult to ensure that
         some blocks will reach 0% utilization. Consequently, this strategy can be
         expected to scale down effectively only when # of workers, or tasks executing
-        per block is close to 1.
+        per block is close to 1, unless the executor is configured with a
+        :class:`~parsl.executors.high_throughput.manager_selector.PackingManagerSelector`,
+        which fills the busiest blocks first.
 
         Args:
             - tasks (task_ids): Not used here.
@@ -74,3 +74,16 @@ class BadMessage(ExecutorError):
 
     def __str__(self):
         return "Received an unsupported message. Reason:{}".format(self.reason)
+
+
+class ExecutorQueueFull(ExecutorError):
+    """ The executor's limit on outstanding tasks or task bytes was reached and
+    the task could not be admitted in time
+    """
+
+    def __init__(self, executor, reason):
+        self.executor = executor
+        self.reason = reason
+
+    def __str__(self):
+        return "Executor {} cannot accept more tasks: {}".format(self.executor, self.reason)
@@ -20,6 +20,7 @@ from mpi4py import MPI
 from parsl.app.errors import RemoteExceptionWrapper
 from parsl.version import VERSION as PARSL_VERSION
 from parsl.serialize import unpack_apply_message, serialize
+from parsl.executors.high_throughput.messages import TASK_WIRE_VERSION, unpack_task_frames
 
 RESULT_TAG = 10
 TASK_REQUEST_TAG = 11
@@ -97,6 +98,7 @@ class Manager(object):
                'python_v': "{}.{}.{}".format(sys.version_info.major,
                                              sys.version_info.minor,
                                              sys.version_info.micro),
+               'wire_v': TASK_WIRE_VERSION,
                'os': platform.system(),
                'hostname': platform.node(),
                'dir': os.getcwd(),
@@ -183,8 +185,8 @@ class Manager(object):
             socks = dict(poller.poll(timeout=poll_timer))
 
             if self.task_incoming in socks and socks[self.task_incoming] == zmq.POLLIN:
-                _, pkl_msg = self.task_incoming.recv_multipart()
-                tasks = pickle.loads(pkl_msg)
+                _, *frames = self.task_incoming.recv_multipart()
+                tasks = unpack_task_frames(frames)
                 last_interchange_contact = time.time()
 
                 if tasks == 'STOP':
@@ -5,6 +5,7 @@ import threading
 import queue
 import datetime
 import pickle
+import time
 from multiprocessing import Process, Queue
 from typing import Dict  # noqa F401 (used in type annotation)
 from typing import List, Optional, Tuple, Union, Any
@@ -14,10 +15,11 @@ from parsl.serialize import pack_apply_message, deserialize
 from parsl.app.errors import RemoteExceptionWrapper
 from parsl.executors.high_throughput import zmq_pipes
 from parsl.executors.high_throughput import interchange
+from parsl.executors.high_throughput.manager_selector import ManagerSelector, RandomManagerSelector
 from parsl.executors.errors import (
     BadMessage, ScalingFailed,
     DeserializationError, SerializationError,
-    UnsupportedFeatureError
+    UnsupportedFeatureError, ExecutorQueueFull
 )
 
 from parsl.executors.status_handling import StatusHandlingExecutor
@@ -162,6 +164,49 @@ class HighThroughputExecutor(StatusHandlingExecutor, RepresentationMixin):
 
     worker_logdir_root : string
         In case of a remote file system, specify the path to where logs will be kept.
+
+    manager_selector : :class:`~parsl.executors.high_throughput.manager_selector.ManagerSelector`
+        Policy deciding which managers the interchange sends tasks to first. Options include
+        :class:`~parsl.executors.high_throughput.manager_selector.RandomManagerSelector`,
+        :class:`~parsl.executors.high_throughput.manager_selector.LeastLoadedManagerSelector`,
+        :class:`~parsl.executors.high_throughput.manager_selector.RoundRobinManagerSelector` and
+        :class:`~parsl.executors.high_throughput.manager_selector.PackingManagerSelector`, which
+        concentrates tasks on few blocks so that idle blocks can be scaled in.
+        Default: RandomManagerSelector()
+
+    max_outstanding_tasks : int | None
+        Maximum number of tasks that have been submitted to this executor but have not yet
+        returned a result. Once reached, ``submit`` waits for results to come back, as
+        configured by ``submit_timeout``. Default: None (no limit)
+
+    max_outstanding_bytes : int | None
+        Maximum total size, in bytes, of the serialized function and arguments of the tasks
+        that have been submitted to this executor but have not yet returned a result. This
+        bounds the memory used to queue tasks in the interchange. A single task larger than
+        the limit is admitted once nothing else is outstanding. Default: None (no limit)
+
+    submit_timeout : float | None
+        Seconds for which ``submit`` waits for room under ``max_outstanding_tasks`` and
+        ``max_outstanding_bytes`` before raising
+        :class:`~parsl.executors.errors.ExecutorQueueFull`. 0 raises immediately.
+        Default: None (wait indefinitely)
+
+    result_batch_size : int
+        The interchange holds back results and forwards them to the executor together, in one
+        message, once this many have accumulated or once the oldest has waited
+        ``result_batch_period``. Larger batches cut the per message overhead of the executor
+        at high rates of short tasks, at the cost of the latency of individual results.
+        Default: 1 (meaning no batching)
+
+    result_batch_period : int
+        The longest time, in milliseconds, that the interchange holds back a result to batch
+        it with others. Default: 0
+
+    worker_shared_memory_threshold : int | None
+        Task and result buffers of at least this many bytes are passed between a manager and
+        its workers through shared memory, rather than being pickled through a pipe. Buffers
+        fall back to the pipe on Python versions before 3.8, or when /dev/shm is full.
+        None disables shared memory. Default: 2 MiB
     """
 
     @typeguard.typechecked
@@ -186,7 +231,14 @@ class HighThroughputExecutor(StatusHandlingExecutor, RepresentationMixin):
                  poll_period: int = 10,
                  address_probe_timeout: Optional[int] = None,
                  managed: bool = True,
-                 worker_logdir_root: Optional[str] = None):
+                 worker_logdir_root: Optional[str] = None,
+                 manager_selector: ManagerSelector = RandomManagerSelector(),
+                 max_outstanding_tasks: Optional[int] = None,
+                 max_outstanding_bytes: Optional[int] = None,
+                 submit_timeout: Optional[float] = None,
+                 result_batch_size: int = 1,
+                 result_batch_period: int = 0,
+                 worker_shared_memory_threshold: Optional[int] = 2 ** 21):
 
         logger.debug("Initializing HighThroughputExecutor")
 
@@ -238,6 +290,16 @@ class HighThroughputExecutor(StatusHandlingExecutor, RepresentationMixin):
         self.run_dir = '.'
         self.worker_logdir_root = worker_logdir_root
         self.cpu_affinity = cpu_affinity
+        self.manager_selector = manager_selector
+        self.max_outstanding_tasks = max_outstanding_tasks
+        self.max_outstanding_bytes = max_outstanding_bytes
+        self.submit_timeout = submit_timeout
+        self.result_batch_size = result_batch_size
+        self.result_batch_period = result_batch_period
+        self.worker_shared_memory_threshold = worker_shared_memory_threshold
+        self._task_sizes = {}  # type: Dict[int, int]
+        self._outstanding_bytes = 0
+        self._admission_cv = threading.Condition()
 
         if not launch_cmd:
             self.launch_cmd = ("process_worker_pool.py {debug} {max_workers} "
@@ -253,7 +315,8 @@ class HighThroughputExecutor(StatusHandlingExecutor, RepresentationMixin):
                                "--hb_period={heartbeat_period} "
                                "{address_probe_timeout_string} "
                                "--hb_threshold={heartbeat_threshold} "
-                               "--cpu-affinity {cpu_affinity} ")
+                               "--cpu-affinity {cpu_affinity} "
+                               "{shm_threshold_string} ")
 
     def initialize_scaling(self):
         """ Compose the launch command and call the scale_out
@@ -267,6 +330,9 @@ class HighThroughputExecutor(StatusHandlingExecutor, RepresentationMixin):
         address_probe_timeout_string = ""
         if self.address_probe_timeout:
             address_probe_timeout_string = "--address_probe_timeout={}".format(self.address_probe_timeout)
+        shm_threshold_string = ""
+        if self.worker_shared_memory_threshold is not None:
+            shm_threshold_string = "--shm_threshold={}".format(self.worker_shared_memory_threshold)
         worker_logdir = "{}/{}".format(self.run_dir, self.label)
         if self.worker_logdir_root is not None:
             worker_logdir = "{}/{}".format(self.worker_logdir_root, self.label)
@@ -285,7 +351,8 @@ class HighThroughputExecutor(StatusHandlingExecutor, RepresentationMixin):
                                        heartbeat_threshold=self.heartbeat_threshold,
                                        poll_period=self.poll_period,
                                        logdir=worker_logdir,
-                                       cpu_affinity=self.cpu_affinity)
+                                       cpu_affinity=self.cpu_affinity,
+                                       shm_threshold_string=shm_threshold_string)
         self.launch_cmd = l_cmd
         logger.debug("Launch command: {}".format(self.launch_cmd))
 
@@ -380,6 +447,8 @@ class HighThroughputExecutor(StatusHandlingExecutor, RepresentationMixin):
                     return
 
                 else:
+                    # The admission capacity of a whole batch of results is returned at once
+                    completed = []
                     for serialized_msg in msgs:
                         try:
                             msg = pickle.loads(serialized_msg)
@@ -399,6 +468,7 @@ class HighThroughputExecutor(StatusHandlingExecutor, RepresentationMixin):
                             continue
 
                         task_fut = self.tasks.pop(tid)
+                        completed.append(tid)
 
                         if 'result' in msg:
                             result = deserialize(msg['result'])
@@ -423,6 +493,7 @@ class HighThroughputExecutor(StatusHandlingExecutor, RepresentationMixin):
                                     DeserializationError("Received exception, but handling also threw an exception: {}".format(e)))
                         else:
                             raise BadMessage("Message received is neither result or exception")
+                    self._release_admission(completed)
 
             if not self.is_alive:
                 break
@@ -447,6 +518,9 @@ class HighThroughputExecutor(StatusHandlingExecutor, RepresentationMixin):
                                           "logdir": "{}/{}".format(self.run_dir, self.label),
                                           "heartbeat_threshold": self.heartbeat_threshold,
                                           "poll_period": self.poll_period,
+                                          "manager_selector": self.manager_selector,
+                                          "result_batch_size": self.result_batch_size,
+                                          "result_batch_period": self.result_batch_period,
                                           "logging_level": logging.DEBUG if self.worker_debug else logging.INFO
                                   },
                                   daemon=True,
@@ -491,6 +565,56 @@ class HighThroughputExecutor(StatusHandlingExecutor, RepresentationMixin):
         logger.debug("Sent hold request to worker: {}".format(worker_id))
         return c
 
+    @property
+    def queue_stats(self):
+        """Number and total size of the tasks waiting in the interchange to be sent to a manager"""
+        return self.command_client.run("QUEUE_STATS")
+
+    def _admit(self, task_id, size):
+        """ Account for a new task of ``size`` bytes, first waiting until it fits under
+        the outstanding task limits
+
+        Tasks submitted from the queue management thread, such as dependent tasks launched
+        from a result callback, are admitted immediately: that thread is the one that
+        frees capacity, so it must never wait for it.
+        """
+        wait = ((self.max_outstanding_tasks is not None or self.max_outstanding_bytes is not None) and
+                threading.current_thread() is not self._queue_management_thread)
+
+        def full():
+            if not self._task_sizes:
+                return False
+            if self.max_outstanding_tasks is not None and len(self._task_sizes) >= self.max_outstanding_tasks:
+                return True
+            if self.max_outstanding_bytes is not None and self._outstanding_bytes + size > self.max_outstanding_bytes:
+                return True
+            return False
+
+        deadline = None if self.submit_timeout is None else time.time() + self.submit_timeout
+        with self._admission_cv:
+            while wait and full():
+                if self.bad_state_is_set:
+                    raise self.executor_exception
+                if deadline is None:
+                    timeout = 1
+                else:
+                    timeout = min(1, deadline - time.time())
+                    if timeout <= 0:
+                        raise ExecutorQueueFull(self.label, "{} tasks and {} bytes outstanding".format(
+                            len(self._task_sizes), self._outstanding_bytes))
+                self._admission_cv.wait(timeout)
+            self._task_sizes[task_id] = size
+            self._outstanding_bytes += size
+
+    def _release_admission(self, task_ids):
+        """ Return the admission capacity held by tasks that have completed """
+        if not task_ids:
+            return
+        with self._admission_cv:
+            for task_id in task_ids:
+                self._outstanding_bytes -= self._task_sizes.pop(task_id, 0)
+            self._admission_cv.notify_all()
+
     @property
     def outstanding(self):
         outstanding_c = self.command_client.run("OUTSTANDING_C")
@@ -536,41 +660,47 @@ class HighThroughputExecutor(StatusHandlingExecutor, RepresentationMixin):
         Kwargs:
             - kwargs (dict) : A dictionary of arbitrary keyword args for func.
 
+        The only resource specification supported is ``{'priority': <int>}``. Pending tasks
+        with a higher priority are dispatched to managers first. The default priority is 0.
+
         Returns:
               Future
         """
-        if resource_specification:
+        if resource_specification and set(resource_specification) != {'priority'}:
             logger.error("Ignoring the resource specification. "
                          "Parsl resource specification is not supported in HighThroughput Executor. "
                          "Please check WorkQueueExecutor if resource specification is needed.")
             raise UnsupportedFeatureError('resource specification', 'HighThroughput Executor', 'WorkQueue Executor')
 
+        priority = resource_specification.get('priority', 0) if resource_specification else 0
+        if not isinstance(priority, int) or not -2 ** 63 <= priority < 2 ** 63:
+            raise ValueError("Task priority must be a 64 bit integer, got {!r}".format(priority))
+
         if self.bad_state_is_set:
             raise self.executor_exception
 
-        self._task_counter += 1
-        task_id = self._task_counter
-
         # handle people sending blobs gracefully
         args_to_print = args
         if logger.getEffectiveLevel() >= logging.DEBUG:
             args_to_print = tuple([arg if len(repr(arg)) < 100 else (repr(arg)[:100] + '...') for arg in args])
         logger.debug("Pushing function {} to queue with args {}".format(func, args_to_print))
 
-        fut = Future()
-        self.tasks[task_id] = fut
-
         try:
             fn_buf = pack_apply_message(func, args, kwargs,
                                         buffer_threshold=1024 * 1024)
         except TypeError:
             raise SerializationError(func.__name__)
 
-        msg = {"task_id": task_id,
-               "buffer": fn_buf}
+        self._task_counter += 1
+        task_id = self._task_counter
+
+        self._admit(task_id, len(fn_buf))
+
+        fut = Future()
+        self.tasks[task_id] = fut
 
         # Post task to the the outgoing queue
-        self.outgoing_q.put(msg)
+        self.outgoing_q.put(task_id, fn_buf, priority)
 
         # Return the future
         return fut
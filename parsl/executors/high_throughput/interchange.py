@@ -4,24 +4,31 @@ import zmq
 import os
 import sys
 import platform
-import random
 import time
+import heapq
 import datetime
 import pickle
 import logging
 import queue
 import threading
 import json
+import itertools
+import math
+import struct
 
 from parsl.version import VERSION as PARSL_VERSION
 from parsl.serialize import ParslSerializer
 serialize_object = ParslSerializer().serialize
 
 from parsl.app.errors import RemoteExceptionWrapper
+from parsl.executors.high_throughput.manager_selector import RandomManagerSelector
+from parsl.executors.high_throughput.messages import TASK_WIRE_VERSION, decode_task_header, pack_task_frames
 from parsl.monitoring.message_type import MessageType
 from parsl.process_loggers import wrap_with_logs
 
 
+logger = logging.getLogger("interchange")
+
 HEARTBEAT_CODE = (2 ** 32) - 1
 PKL_HEARTBEAT_CODE = pickle.dumps((2 ** 32) - 1)
 
@@ -110,6 +117,9 @@ class Interchange(object):
                  logdir=".",
                  logging_level=logging.INFO,
                  poll_period=10,
+                 manager_selector=None,
+                 result_batch_size=1,
+                 result_batch_period=0,
              ):
         """
         Parameters
@@ -150,6 +160,18 @@ class Interchange(object):
         poll_period : int
              The main thread polling period, in milliseconds. Default: 10ms
 
+        manager_selector : ManagerSelector
+             Decides the order in which managers with free capacity are offered tasks.
+             Default: None (meaning RandomManagerSelector)
+
+        result_batch_size : int
+             Results from managers are held back and forwarded to the client together once this
+             many have accumulated, or once the oldest has been held for result_batch_period. Default: 1
+
+        result_batch_period : int
+             The longest time, in milliseconds, that a result is held back to be forwarded with
+             others. Default: 0 (meaning results are forwarded as soon as they arrive)
+
         """
         self.logdir = logdir
         os.makedirs(self.logdir, exist_ok=True)
@@ -160,6 +182,14 @@ class Interchange(object):
         self.client_address = client_address
         self.interchange_address = interchange_address
         self.poll_period = poll_period
+        self.manager_selector = manager_selector if manager_selector is not None else RandomManagerSelector()
+        self.result_batch_size = result_batch_size
+        self.result_batch_period = result_batch_period
+
+        # Result messages received from managers but not yet forwarded to the client,
+        # and the time at which the oldest of them arrived
+        self._pending_results = []
+        self._pending_results_since = None
 
         logger.info("Attempting connection to client at {} on ports: {},{},{}".format(
             client_address, client_ports[0], client_ports[1], client_ports[2]))
@@ -180,7 +210,14 @@ class Interchange(object):
         self.hub_address = hub_address
         self.hub_port = hub_port
 
-        self.pending_task_queue = queue.Queue(maxsize=10 ** 6)
+        # Entries are (-priority, sequence, task) so that tasks of higher priority are
+        # dispatched first, and tasks of equal priority in the order they arrived.
+        self.pending_task_queue = queue.PriorityQueue(maxsize=10 ** 6)
+        self._task_sequence = itertools.count()
+        # Total size of the buffers in pending_task_queue, updated by both the
+        # task puller thread and the main thread
+        self._pending_task_bytes = 0
+        self._pending_task_bytes_lock = threading.Lock()
 
         self.worker_ports = worker_ports
         self.worker_port_range = worker_port_range
@@ -212,10 +249,16 @@ class Interchange(object):
 
         self.heartbeat_threshold = heartbeat_threshold
 
+        # Min-heap of (deadline, manager) entries, one per registered manager.
+        # Heartbeats only update last_heartbeat; an entry is re-examined (and
+        # pushed back with a fresh deadline) only once its deadline has passed.
+        self._heartbeat_deadlines = []
+
         self.current_platform = {'parsl_v': PARSL_VERSION,
                                  'python_v': "{}.{}.{}".format(sys.version_info.major,
                                                                sys.version_info.minor,
                                                                sys.version_info.micro),
+                                 'wire_v': TASK_WIRE_VERSION,
                                  'os': platform.system(),
                                  'hostname': platform.node(),
                                  'dir': os.getcwd()}
@@ -233,17 +276,20 @@ class Interchange(object):
         Returns
         -------
         List of upto count tasks. May return fewer than count down to an empty list
-            eg. [{'task_id':<x>, 'buffer':<buf>} ... ]
+            eg. [{'task_id':<x>, 'buffer':<zmq.Frame>} ... ]
         """
         tasks = []
         for i in range(0, count):
             try:
-                x = self.pending_task_queue.get(block=False)
+                _, _, x = self.pending_task_queue.get(block=False)
             except queue.Empty:
                 break
             else:
                 tasks.append(x)
 
+        if tasks:
+            with self._pending_task_bytes_lock:
+                self._pending_task_bytes -= sum(len(t['buffer']) for t in tasks)
         return tasks
 
     @wrap_with_logs(target="interchange")
@@ -263,20 +309,65 @@ class Interchange(object):
 
         while not kill_event.is_set():
             try:
-                msg = self.task_incoming.recv_pyobj()
+                # Task buffers are kept as zmq.Frame objects and later forwarded to
+                # managers as they are, without being copied or deserialized here.
+                frames = self.task_incoming.recv_multipart(copy=False)
             except zmq.Again:
                 # We just timed out while attempting to receive
                 logger.debug("[TASK_PULL_THREAD] {} tasks in internal queue".format(self.pending_task_queue.qsize()))
                 continue
 
-            if msg == 'STOP':
-                kill_event.set()
-                break
+            if len(frames) == 1:
+                msg = pickle.loads(frames[0].bytes)
+                if msg == 'STOP':
+                    kill_event.set()
+                    break
+                logger.warning("[TASK_PULL_THREAD] Ignoring unexpected control message: {}".format(msg))
+            elif len(frames) != 2:
+                logger.warning("[TASK_PULL_THREAD] Dropping malformed task message with {} frames".format(len(frames)))
             else:
-                self.pending_task_queue.put(msg)
+                header_frame, buf_frame = frames
+                try:
+                    task_id, priority = decode_task_header(header_frame.buffer)
+                except struct.error:
+                    logger.warning("[TASK_PULL_THREAD] Dropping task message with a malformed header")
+                    continue
+                with self._pending_task_bytes_lock:
+                    self._pending_task_bytes += len(buf_frame)
+                self.pending_task_queue.put((-priority, next(self._task_sequence), {'task_id': task_id, 'buffer': buf_frame}))
                 task_counter += 1
                 logger.debug("[TASK_PULL_THREAD] Fetched task:{}".format(task_counter))
 
+    def _forward_results(self, now, flush=False):
+        """ Forward the pending results to the client as a single message, if there
+        are enough of them or the oldest has been held for long enough
+
+        Parameters
+        ----------
+        now : float
+            The current time, as returned by time.time()
+
+        flush : bool
+            Forward any pending results regardless of the batching limits
+        """
+        if not self._pending_results:
+            return
+        if (flush or len(self._pending_results) >= self.result_batch_size or
+                (now - self._pending_results_since) * 1000 >= self.result_batch_period):
+            logger.debug("[MAIN] Forwarding {} results to the client".format(len(self._pending_results)))
+            self.results_outgoing.send_multipart(self._pending_results)
+            self._pending_results = []
+            self._pending_results_since = None
+
+    def _poll_timeout(self, poll_period, now):
+        """ Return the poll timeout, in milliseconds, which wakes the main loop in time
+        to forward held back results """
+        if not self._pending_results:
+            return poll_period
+        # Rounded up, as zmq truncates the timeout to whole milliseconds
+        remaining = math.ceil(self.result_batch_period - (now - self._pending_results_since) * 1000)
+        return max(0, min(poll_period, remaining))
+
     def _create_monitoring_channel(self):
         if self.hub_address and self.hub_port:
             logger.info("Connecting to monitoring")
@@ -295,6 +386,72 @@ class Interchange(object):
                                     datetime.datetime.now(),
                                     self._ready_manager_queue[manager]))
 
+    def _task_completed(self, manager, task_id, received_time):
+        """ Remove a task from the in-flight tasks of the manager which returned
+        its result, and record how long the task was out
+
+        Parameters
+        ----------
+        manager : bytes
+            Identity of the manager which returned the result
+
+        task_id : int
+            Id of the completed task
+
+        received_time : float
+            Time at which the result was received, as returned by time.time()
+        """
+        dispatched_time = self._ready_manager_queue[manager]['tasks'].pop(task_id, None)
+        if dispatched_time is None:
+            logger.warning("[MAIN] Received result for task {} which was not dispatched to manager {}".format(task_id, manager))
+            return
+        self._record_task_latency(manager, received_time - dispatched_time)
+
+    def _record_task_latency(self, manager, latency):
+        """ Accumulate the dispatch-to-result latency of a completed task
+        into the statistics kept for its manager
+
+        Parameters
+        ----------
+        manager : bytes
+            Identity of the manager which returned the result
+
+        latency : float
+            Seconds between dispatching the task to the manager and receiving its result
+        """
+        m = self._ready_manager_queue[manager]
+        m['tasks_completed'] += 1
+        m['total_task_latency'] += latency
+        if latency > m['max_task_latency']:
+            m['max_task_latency'] = latency
+
+    def _expired_managers(self, now):
+        """ Find the managers whose last heartbeat is older than heartbeat_threshold
+
+        Only the managers whose heartbeat deadline has passed are examined,
+        so the cost is independent of the number of healthy managers.
+
+        Parameters
+        ----------
+        now : float
+            Current time, as returned by time.time()
+
+        Returns
+        -------
+        List of managers that have missed too many heartbeats
+        """
+        expired = []
+        while self._heartbeat_deadlines and self._heartbeat_deadlines[0][0] < now:
+            _, manager = heapq.heappop(self._heartbeat_deadlines)
+            if manager not in self._ready_manager_queue:
+                continue
+            deadline = self._ready_manager_queue[manager]['last_heartbeat'] + self.heartbeat_threshold
+            if deadline < now:
+                expired.append(manager)
+            else:
+                heapq.heappush(self._heartbeat_deadlines, (deadline, manager))
+        return expired
+
     @wrap_with_logs(target="interchange")
     def _command_server(self, kill_event):
         """ Command server to run async command to the interchange
@@ -310,28 +467,41 @@ class Interchange(object):
                 logger.debug("[COMMAND] Received command request: {}".format(command_req))
                 if command_req == "OUTSTANDING_C":
                     outstanding = self.pending_task_queue.qsize()
-                    for manager in self._ready_manager_queue:
-                        outstanding += len(self._ready_manager_queue[manager]['tasks'])
+                    for m in list(self._ready_manager_queue.values()):
+                        outstanding += len(m['tasks'])
                     reply = outstanding
 
+                elif command_req == "QUEUE_STATS":
+                    reply = {'tasks': self.pending_task_queue.qsize(),
+                             'bytes': self._pending_task_bytes}
+
                 elif command_req == "WORKERS":
                     num_workers = 0
-                    for manager in self._ready_manager_queue:
-                        num_workers += self._ready_manager_queue[manager]['worker_count']
+                    for m in list(self._ready_manager_queue.values()):
+                        num_workers += m['worker_count']
                     reply = num_workers
 
                 elif command_req == "MANAGERS":
                     reply = []
-                    for manager in self._ready_manager_queue:
+                    # The main thread registers and removes managers concurrently,
+                    # so iterate over a snapshot and only read from the records.
+                    for manager, m in list(self._ready_manager_queue.items()):
                         idle_duration = 0
-                        if self._ready_manager_queue[manager]['idle_since'] is not None:
-                            idle_duration = time.time() - self._ready_manager_queue[manager]['idle_since']
+                        if m['idle_since'] is not None:
+                            idle_duration = time.time() - m['idle_since']
+                        tasks_completed = m['tasks_completed']
+                        mean_task_latency = None
+                        if tasks_completed:
+                            mean_task_latency = m['total_task_latency'] / tasks_completed
                         resp = {'manager': manager.decode('utf-8'),
-                                'block_id': self._ready_manager_queue[manager]['block_id'],
-                                'worker_count': self._ready_manager_queue[manager]['worker_count'],
-                                'tasks': len(self._ready_manager_queue[manager]['tasks']),
+                                'block_id': m['block_id'],
+                                'worker_count': m['worker_count'],
+                                'tasks': len(m['tasks']),
+                                'tasks_completed': tasks_completed,
+                                'mean_task_latency': mean_task_latency,
+                                'max_task_latency': m['max_task_latency'],
                                 'idle_duration': idle_duration,
-                                'active': self._ready_manager_queue[manager]['active']}
+                                'active': m['active']}
                         reply.append(resp)
 
                 elif command_req.startswith("HOLD_WORKER"):
@@ -401,7 +571,7 @@ class Interchange(object):
         interesting_managers = set()
 
         while not self._kill_event.is_set():
-            self.socks = dict(poller.poll(timeout=poll_period))
+            self.socks = dict(poller.poll(timeout=self._poll_timeout(poll_period, time.time())))
 
             # Listen for requests for work
             if self.task_outgoing in self.socks and self.socks[self.task_outgoing] == zmq.POLLIN:
@@ -428,8 +598,13 @@ class Interchange(object):
                                                               'max_capacity': 0,
                                                               'worker_count': 0,
                                                               'active': True,
-                                                              'tasks': []}
+                                                              'tasks': {},
+                                                              'tasks_completed': 0,
+                                                              'total_task_latency': 0.0,
+                                                              'max_task_latency': 0.0}
                     if reg_flag is True:
+                        heapq.heappush(self._heartbeat_deadlines,
+                                       (self._ready_manager_queue[manager]['last_heartbeat'] + self.heartbeat_threshold, manager))
                         interesting_managers.add(manager)
                         logger.info("[MAIN] Adding manager: {} to ready queue".format(manager))
                         self._ready_manager_queue[manager].update(msg)
@@ -437,14 +612,17 @@ class Interchange(object):
                         self._send_monitoring_info(hub_channel, manager)
 
                         if (msg['python_v'].rsplit(".", 1)[0] != self.current_platform['python_v'].rsplit(".", 1)[0] or
-                            msg['parsl_v'] != self.current_platform['parsl_v']):
+                            msg['parsl_v'] != self.current_platform['parsl_v'] or
+                            msg.get('wire_v') != self.current_platform['wire_v']):
                             logger.warning("[MAIN] Manager {} has incompatible version info with the interchange".format(manager))
                             logger.debug("Setting kill event")
                             self._kill_event.set()
-                            e = VersionMismatch("py.v={} parsl.v={}".format(self.current_platform['python_v'].rsplit(".", 1)[0],
-                                                                            self.current_platform['parsl_v']),
-                                                "py.v={} parsl.v={}".format(msg['python_v'].rsplit(".", 1)[0],
-                                                                            msg['parsl_v'])
+                            e = VersionMismatch("py.v={} parsl.v={} wire.v={}".format(self.current_platform['python_v'].rsplit(".", 1)[0],
+                                                                                      self.current_platform['parsl_v'],
+                                                                                      self.current_platform['wire_v']),
+                                                "py.v={} parsl.v={} wire.v={}".format(msg['python_v'].rsplit(".", 1)[0],
+                                                                                      msg['parsl_v'],
+                                                                                      msg.get('wire_v'))
                             )
                             result_package = {'task_id': -1, 'exception': serialize_object(e)}
                             pkl_package = pickle.dumps(result_package)
@@ -478,11 +656,11 @@ class Interchange(object):
                 interesting=len(interesting_managers)))
 
             if interesting_managers and not self.pending_task_queue.empty():
-                shuffled_managers = list(interesting_managers)
-                random.shuffle(shuffled_managers)
+                sorted_managers = self.manager_selector.sort_managers(self._ready_manager_queue, interesting_managers)
 
-                while shuffled_managers and not self.pending_task_queue.empty():  # cf. the if statement above...
-                    manager = shuffled_managers.pop()
+                for manager in sorted_managers:
+                    if self.pending_task_queue.empty():
+                        break
                     tasks_inflight = len(self._ready_manager_queue[manager]['tasks'])
                     real_capacity = min(self._ready_manager_queue[manager]['free_capacity'],
                                         self._ready_manager_queue[manager]['max_capacity'] - tasks_inflight)
@@ -490,12 +668,12 @@ class Interchange(object):
                     if (real_capacity and self._ready_manager_queue[manager]['active']):
                         tasks = self.get_tasks(real_capacity)
                         if tasks:
-                            self.task_outgoing.send_multipart([manager, b'', pickle.dumps(tasks)])
+                            self.task_outgoing.send_multipart([manager, b''] + pack_task_frames(tasks), copy=False)
                             task_count = len(tasks)
                             count += task_count
                             tids = [t['task_id'] for t in tasks]
                             self._ready_manager_queue[manager]['free_capacity'] -= task_count
-                            self._ready_manager_queue[manager]['tasks'].extend(tids)
+                            self._ready_manager_queue[manager]['tasks'].update(dict.fromkeys(tids, time.time()))
                             self._ready_manager_queue[manager]['idle_since'] = None
                             logger.debug("[MAIN] Sent tasks: {} to manager {}".format(tids, manager))
                             if self._ready_manager_queue[manager]['free_capacity'] > 0:
@@ -518,11 +696,12 @@ class Interchange(object):
                     logger.warning("[MAIN] Received a result from a un-registered manager: {}".format(manager))
                 else:
                     logger.debug("[MAIN] Got {} result items in batch".format(len(b_messages)))
+                    received_time = time.time()
                     for b_message in b_messages:
                         r = pickle.loads(b_message)
                         try:
                             if int(r['task_id']) != -1:
-                                self._ready_manager_queue[manager]['tasks'].remove(r['task_id'])
+                                self._task_completed(manager, r['task_id'], received_time)
                             elif 'heartbeat' in r:
                                 logger.debug("[MAIN] Manager {} sent heartbeat via results connection".format(manager))
                         except Exception:
@@ -532,16 +711,20 @@ class Interchange(object):
                                 manager,
                                 self._ready_manager_queue[manager]['tasks']))
 
-                    self.results_outgoing.send_multipart(b_messages)
-                    logger.debug("[MAIN] Current tasks: {}".format(self._ready_manager_queue[manager]['tasks']))
+                    if not self._pending_results:
+                        self._pending_results_since = received_time
+                    self._pending_results.extend(b_messages)
+                    logger.debug("[MAIN] Manager {} has {} tasks in flight".format(manager, len(self._ready_manager_queue[manager]['tasks'])))
                     if len(self._ready_manager_queue[manager]['tasks']) == 0:
                         self._ready_manager_queue[manager]['idle_since'] = time.time()
                 logger.debug("[MAIN] leaving results_incoming section")
 
-            bad_managers = [manager for manager in self._ready_manager_queue if
-                            time.time() - self._ready_manager_queue[manager]['last_heartbeat'] > self.heartbeat_threshold]
+            now = time.time()
+            self._forward_results(now)
+
+            bad_managers = self._expired_managers(now)
             for manager in bad_managers:
-                logger.debug("[MAIN] Last: {} Current: {}".format(self._ready_manager_queue[manager]['last_heartbeat'], time.time()))
+                logger.debug("[MAIN] Last: {} Current: {}".format(self._ready_manager_queue[manager]['last_heartbeat'], now))
                 logger.warning("[MAIN] Too many heartbeats missed for manager {}".format(manager))
                 if self._ready_manager_queue[manager]['active']:
                     self._ready_manager_queue[manager]['active'] = False
@@ -559,6 +742,7 @@ class Interchange(object):
                 if manager in interesting_managers:
                     interesting_managers.remove(manager)
 
+        self._forward_results(time.time(), flush=True)
         delta = time.time() - start
         logger.info("Processed {} tasks in {} seconds".format(count, delta))
         logger.warning("Exiting")
@@ -631,7 +815,6 @@ if __name__ == '__main__':
     args = parser.parse_args()
 
     # Setup logging
-    global logger
     format_string = "%(asctime)s %(name)s:%(lineno)d [%(levelname)s]  %(message)s"
 
     logger = logging.getLogger("interchange")
@@ -0,0 +1,90 @@
+from abc import ABCMeta, abstractmethod
+import random
+
+from parsl.utils import RepresentationMixin
+
+
+class ManagerSelector(RepresentationMixin, metaclass=ABCMeta):
+    """ManagerSelectors decide the order in which the interchange offers pending
+    tasks to managers that have asked for work.
+
+    A selector is handed to the interchange through the ``manager_selector``
+    option of the :class:`~parsl.executors.HighThroughputExecutor`, and is used
+    from the interchange main loop only.
+    """
+
+    @abstractmethod
+    def sort_managers(self, ready_managers, manager_list):
+        """ Order the managers that should be offered tasks
+
+        Parameters
+        ----------
+        ready_managers : dict
+            The interchange's records of all registered managers, keyed by manager id.
+            The number of tasks in flight on a manager is ``len(record['tasks'])``.
+
+        manager_list : set
+            Ids of the managers with free capacity.
+
+        Returns
+        -------
+        List of manager ids, most preferred first.
+        """
+        pass
+
+
+class RandomManagerSelector(ManagerSelector):
+    """Offers tasks to managers in a random order, spreading them across
+    all blocks. This is the default.
+    """
+
+    def sort_managers(self, ready_managers, manager_list):
+        c_manager_list = list(manager_list)
+        random.shuffle(c_manager_list)
+        return c_manager_list
+
+
+class LeastLoadedManagerSelector(ManagerSelector):
+    """Offers tasks to the managers with the fewest tasks in flight first."""
+
+    def sort_managers(self, ready_managers, manager_list):
+        return sorted(manager_list, key=lambda m: len(ready_managers[m]['tasks']))
+
+
+class RoundRobinManagerSelector(ManagerSelector):
+    """Offers tasks to managers in turn, starting each pass from the manager
+    after the one which was preferred on the previous pass.
+    """
+
+    def __init__(self):
+        self._last = None
+
+    def sort_managers(self, ready_managers, manager_list):
+        c_manager_list = sorted(manager_list)
+        if self._last is not None:
+            after = [m for m in c_manager_list if m > self._last]
+            before = [m for m in c_manager_list if m <= self._last]
+            c_manager_list = after + before
+        if c_manager_list:
+            self._last = c_manager_list[0]
+        return c_manager_list
+
+
+class PackingManagerSelector(ManagerSelector):
+    """Fills the busiest blocks first, and within a block the busiest managers first.
+
+    Keeping work concentrated on few blocks lets the remaining blocks go fully idle,
+    so that the ``htex_auto_scale`` strategy can release them.
+    """
+
+    def sort_managers(self, ready_managers, manager_list):
+        block_load = {}
+        for record in ready_managers.values():
+            block_id = record['block_id']
+            block_load[block_id] = block_load.get(block_id, 0) + len(record['tasks'])
+
+        def key(m):
+            record = ready_managers[m]
+            return (-block_load[record['block_id']], str(record['block_id']), -len(record['tasks']), m)
+
+        return sorted(manager_list, key=key)
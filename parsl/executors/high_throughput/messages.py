@@ -0,0 +1,84 @@
+"""Wire format of the task pipe between the executor, the interchange and the worker pools.
+
+A task travels from the executor to the interchange as two ZMQ frames, a header
+holding the task_id and the task priority, followed by the packed buffer. The
+interchange forwards batches of tasks to a manager as alternating task_id and
+buffer frames, without deserializing the buffers. Control messages, such as
+heartbeats and stop requests, are a single pickled frame.
+"""
+import pickle
+import struct
+
+# Bumped whenever the frame layout of the task pipe changes. Managers report the
+# version they speak at registration and the interchange refuses mismatched ones.
+TASK_WIRE_VERSION = 1
+
+# Width, in bytes, of the little-endian task_id frame
+TASK_ID_WIDTH = 8
+
+# Header frame of a task sent from the executor to the interchange: task_id, priority
+TASK_HEADER = struct.Struct("<Qq")
+
+
+def encode_task_id(task_id):
+    """ Encode a task_id as a fixed-width frame """
+    return task_id.to_bytes(TASK_ID_WIDTH, "little")
+
+
+def decode_task_id(frame):
+    """ Decode a task_id frame produced by :func:`encode_task_id`
+
+    Accepts bytes, or anything exposing the buffer protocol such as a zmq.Frame.
+    """
+    return int.from_bytes(frame, "little")
+
+
+def encode_task_header(task_id, priority=0):
+    """ Encode the header frame of a task sent from the executor to the interchange
+
+    Tasks with a higher priority are dispatched to managers first.
+    """
+    return TASK_HEADER.pack(task_id, priority)
+
+
+def decode_task_header(frame):
+    """ Decode a header frame produced by :func:`encode_task_header`
+
+    Returns
+    -------
+    (task_id, priority)
+
+    Raises
+    ------
+    struct.error if the frame is not a task header
+    """
+    return TASK_HEADER.unpack(frame)
+
+
+def pack_task_frames(tasks):
+    """ Build the frames carrying a batch of tasks from the interchange to a manager
+
+    Parameters
+    ----------
+    tasks : list
+        eg. [{'task_id':<x>, 'buffer':<buf>} ... ]
+    """
+    frames = []
+    for t in tasks:
+        frames.extend([encode_task_id(t['task_id']), t['buffer']])
+    return frames
+
+
+def unpack_task_frames(frames):
+    """ Unpack a message sent by the interchange on the task pipe
+
+    Returns
+    -------
+    The control message, or a list of tasks eg. [{'task_id':<x>, 'buffer':<buf>} ... ]
+    """
+    if len(frames) == 1:
+        return pickle.loads(frames[0])
+    if len(frames) % 2:
+        raise ValueError("Expected task_id and buffer frame pairs, got {} frames".format(len(frames)))
+    return [{'task_id': decode_task_id(tid), 'buffer': buf}
+            for tid, buf in zip(frames[0::2], frames[1::2])]
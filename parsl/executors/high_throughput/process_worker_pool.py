@@ -22,6 +22,9 @@ from parsl.version import VERSION as PARSL_VERSION
 from parsl.app.errors import RemoteExceptionWrapper
 from parsl.executors.high_throughput.errors import WorkerLost
 from parsl.executors.high_throughput.probe import probe_addresses
+from parsl.executors.high_throughput.messages import TASK_WIRE_VERSION, unpack_task_frames
+from parsl.executors.high_throughput.shared_buffers import (export_buffer, import_buffer, release_buffer,
+                                                            release_segment, task_segment_name)
 if platform.system() != 'Darwin':
     from multiprocessing import Queue as mpQueue
     from multiprocessing import Process as mpProcess
@@ -33,6 +36,9 @@ from parsl.serialize import unpack_apply_message, serialize
 
 HEARTBEAT_CODE = (2 ** 32) - 1
 
+# Marks a worker which is not running a task in the tasks in progress array
+NO_TASK = -1
+
 
 class Manager(object):
     """ Manager manages task execution by the workers
@@ -64,7 +70,8 @@ class Manager(object):
                  heartbeat_threshold=120,
                  heartbeat_period=30,
                  poll_period=10,
-                 cpu_affinity=False):
+                 cpu_affinity=False,
+                 shared_memory_threshold=None):
         """
         Parameters
         ----------
@@ -116,6 +123,11 @@ class Manager(object):
 
         cpu_affinity : str
              Whether each worker should force its affinity to different CPUs
+
+        shared_memory_threshold : int
+             Task and result buffers of at least this many bytes are passed between the manager
+             and the workers through shared memory instead of being copied through the queues.
+             Default: None (meaning shared memory is not used)
         """
 
         logger.info("Manager started")
@@ -178,6 +190,8 @@ class Manager(object):
         self.pending_task_queue = mpQueue()
         self.pending_result_queue = mpQueue()
         self.ready_worker_queue = mpQueue()
+        # Workers write to this pipe when they become ready for a task, waking up the task puller
+        self._ready_signal_r, self._ready_signal_w = multiprocessing.Pipe(duplex=False)
 
         self.max_queue_size = self.prefetch_capacity + self.worker_count
 
@@ -187,6 +201,7 @@ class Manager(object):
         self.heartbeat_threshold = heartbeat_threshold
         self.poll_period = poll_period
         self.cpu_affinity = cpu_affinity
+        self.shared_memory_threshold = shared_memory_threshold
 
     def create_reg_message(self):
         """ Creates a registration message to identify the worker to the interchange
@@ -195,6 +210,7 @@ class Manager(object):
                'python_v': "{}.{}.{}".format(sys.version_info.major,
                                              sys.version_info.minor,
                                              sys.version_info.micro),
+               'wire_v': TASK_WIRE_VERSION,
                'worker_count': self.worker_count,
                'uid': self.uid,
                'block_id': self.block_id,
@@ -221,6 +237,11 @@ class Manager(object):
         """ Pull tasks from the incoming tasks 0mq pipe onto the internal
         pending task queue
 
+        The loop wakes up when the interchange sends a message, when a worker
+        signals that it is ready for a task, or when a heartbeat is due. Capacity
+        is requested from the interchange only when it differs from the capacity
+        the interchange was last told about, less the tasks received since.
+
         Parameters:
         -----------
         kill_event : threading.Event
@@ -229,6 +250,7 @@ class Manager(object):
         logger.info("[TASK PULL THREAD] starting")
         poller = zmq.Poller()
         poller.register(self.task_incoming, zmq.POLLIN)
+        poller.register(self._ready_signal_r.fileno(), zmq.POLLIN)
 
         # Send a registration message
         msg = self.create_reg_message()
@@ -238,7 +260,8 @@ class Manager(object):
         last_interchange_contact = time.time()
         task_recv_counter = 0
 
-        poll_timer = self.poll_period
+        # The capacity which the interchange believes this manager has
+        requested = 0
 
         while not kill_event.is_set():
             ready_worker_count = self.ready_worker_queue.qsize()
@@ -250,18 +273,27 @@ class Manager(object):
             if time.time() > last_beat + self.heartbeat_period:
                 self.heartbeat_to_incoming()
                 last_beat = time.time()
+                # Repeat the capacity request with every heartbeat, as a safety net
+                requested = None
 
-            if pending_task_count < self.max_queue_size and ready_worker_count > 0:
-                logger.debug("[TASK_PULL_THREAD] Requesting tasks: {}".format(ready_worker_count))
-                msg = ((ready_worker_count).to_bytes(4, "little"))
+            capacity = max(0, ready_worker_count + self.prefetch_capacity - pending_task_count)
+            if capacity != requested:
+                logger.debug("[TASK_PULL_THREAD] Requesting tasks: {}".format(capacity))
+                msg = ((capacity).to_bytes(4, "little"))
                 self.task_incoming.send(msg)
+                requested = capacity
 
+            poll_timer = max(0, (last_beat + self.heartbeat_period - time.time()) * 1000)
             socks = dict(poller.poll(timeout=poll_timer))
 
+            if self._ready_signal_r.fileno() in socks:
+                # Workers became ready, which the next pass picks up from the ready worker queue
+                while self._ready_signal_r.poll():
+                    self._ready_signal_r.recv_bytes()
+
             if self.task_incoming in socks and socks[self.task_incoming] == zmq.POLLIN:
-                poll_timer = 0
-                _, pkl_msg = self.task_incoming.recv_multipart()
-                tasks = pickle.loads(pkl_msg)
+                _, *frames = self.task_incoming.recv_multipart()
+                tasks = unpack_task_frames(frames)
                 last_interchange_contact = time.time()
 
                 if tasks == 'STOP':
@@ -274,21 +306,17 @@ class Manager(object):
 
                 else:
                     task_recv_counter += len(tasks)
+                    requested = max(0, requested - len(tasks))
                     logger.debug("[TASK_PULL_THREAD] Got tasks: {} of {}".format([t['task_id'] for t in tasks],
                                                                                  task_recv_counter))
 
                     for task in tasks:
+                        task['buffer'] = export_buffer(task['buffer'], self.shared_memory_threshold,
+                                                       name=task_segment_name(self.uid, task['task_id']))
                         self.pending_task_queue.put(task)
-                        # logger.debug("[TASK_PULL_THREAD] Ready tasks: {}".format(
-                        #    [i['task_id'] for i in self.pending_task_queue]))
 
             else:
                 logger.debug("[TASK_PULL_THREAD] No incoming tasks")
-                # Limit poll duration to heartbeat_period
-                # heartbeat_period is in s vs poll_timer in ms
-                if not poll_timer:
-                    poll_timer = self.poll_period
-                poll_timer = min(self.heartbeat_period * 1000, poll_timer * 2)
 
                 # Only check if no messages were received.
                 if time.time() > last_interchange_contact + self.heartbeat_threshold:
@@ -320,7 +348,7 @@ class Manager(object):
 
             try:
                 r = self.pending_result_queue.get(block=True, timeout=push_poll_period)
-                items.append(r)
+                items.append(import_buffer(r))
             except queue.Empty:
                 pass
             except Exception as e:
@@ -355,17 +383,19 @@ class Manager(object):
             for worker_id, p in self.procs.items():
                 if not p.is_alive():
                     logger.info("[WORKER_WATCHDOG_THREAD] Worker {} has died".format(worker_id))
-                    try:
-                        task = self._tasks_in_progress.pop(worker_id)
+                    task_id = self._tasks_in_progress[worker_id]
+                    if task_id != NO_TASK:
+                        self._tasks_in_progress[worker_id] = NO_TASK
                         logger.info("[WORKER_WATCHDOG_THREAD] Worker {} was busy when it died".format(worker_id))
+                        release_segment(task_segment_name(self.uid, task_id))
                         try:
                             raise WorkerLost(worker_id, platform.node())
                         except Exception:
-                            logger.info("[WORKER_WATCHDOG_THREAD] Putting exception for task {} in the pending result queue".format(task['task_id']))
-                            result_package = {'task_id': task['task_id'], 'exception': serialize(RemoteExceptionWrapper(*sys.exc_info()))}
+                            logger.info("[WORKER_WATCHDOG_THREAD] Putting exception for task {} in the pending result queue".format(task_id))
+                            result_package = {'task_id': task_id, 'exception': serialize(RemoteExceptionWrapper(*sys.exc_info()))}
                             pkl_package = pickle.dumps(result_package)
                             self.pending_result_queue.put(pkl_package)
-                    except KeyError:
+                    else:
                         logger.info("[WORKER_WATCHDOG_THREAD] Worker {} was not busy when it died".format(worker_id))
 
                     p = mpProcess(target=worker, args=(worker_id,
@@ -375,7 +405,9 @@ class Manager(object):
                                                        self.pending_result_queue,
                                                        self.ready_worker_queue,
                                                        self._tasks_in_progress,
-                                                       self.cpu_affinity
+                                                       self.cpu_affinity,
+                                                       self.shared_memory_threshold,
+                                                       self._ready_signal_w
                                                  ), name="HTEX-Worker-{}".format(worker_id))
                     self.procs[worker_id] = p
                     logger.info("[WORKER_WATCHDOG_THREAD] Worker {} has been restarted".format(worker_id))
@@ -383,6 +415,22 @@ class Manager(object):
 
         logger.critical("[WORKER_WATCHDOG_THREAD] Exiting")
 
+    def _release_shared_buffers(self):
+        """ Unlink the shared memory held by tasks and results which were never delivered """
+        for task_id in self._tasks_in_progress:
+            if task_id != NO_TASK:
+                release_segment(task_segment_name(self.uid, task_id))
+        for q in (self.pending_task_queue, self.pending_result_queue):
+            while True:
+                try:
+                    item = q.get(block=False)
+                except queue.Empty:
+                    break
+                except Exception:
+                    logger.exception("Failed to drain a queue while releasing shared memory")
+                    break
+                release_buffer(item['buffer'] if isinstance(item, dict) else item)
+
     def start(self):
         """ Start the worker processes.
 
@@ -390,7 +438,9 @@ class Manager(object):
         """
         start = time.time()
         self._kill_event = threading.Event()
-        self._tasks_in_progress = multiprocessing.Manager().dict()
+        # The id of the task each worker is running, indexed by worker id. Each worker
+        # only writes its own slot, and the watchdog reads it once the worker has died.
+        self._tasks_in_progress = multiprocessing.RawArray('q', [NO_TASK] * self.worker_count)
 
         self.procs = {}
         for worker_id in range(self.worker_count):
@@ -401,7 +451,9 @@ class Manager(object):
                                                self.pending_result_queue,
                                                self.ready_worker_queue,
                                                self._tasks_in_progress,
-                                               self.cpu_affinity
+                                               self.cpu_affinity,
+                                               self.shared_memory_threshold,
+                                               self._ready_signal_w
                                          ), name="HTEX-Worker-{}".format(worker_id))
             p.start()
             self.procs[worker_id] = p
@@ -437,6 +489,7 @@ class Manager(object):
                                                                           self.procs[proc_id].is_alive()))
             self.procs[proc_id].join()
             logger.debug("Worker {} joined successfully".format(self.procs[proc_id]))
+        self._release_shared_buffers()
 
         self.task_incoming.close()
         self.result_outgoing.close()
@@ -476,7 +529,8 @@ def execute_task(bufs):
 
 
 @wrap_with_logs(target="worker_log")
-def worker(worker_id, pool_id, pool_size, task_queue, result_queue, worker_queue, tasks_in_progress, cpu_affinity):
+def worker(worker_id, pool_id, pool_size, task_queue, result_queue, worker_queue, tasks_in_progress, cpu_affinity,
+           shared_memory_threshold=None, ready_signal=None):
     """
 
     Put request token into queue
@@ -525,11 +579,13 @@ def worker(worker_id, pool_id, pool_size, task_queue, result_queue, worker_queue
 
     while True:
         worker_queue.put(worker_id)
+        if ready_signal is not None:
+            ready_signal.send_bytes(b'')
 
         # The worker will receive {'task_id':<tid>, 'buffer':<buf>}
         req = task_queue.get()
-        tasks_in_progress[worker_id] = req
         tid = req['task_id']
+        tasks_in_progress[worker_id] = tid
         logger.info("Received task {}".format(tid))
 
         try:
@@ -539,7 +595,7 @@ def worker(worker_id, pool_id, pool_size, task_queue, result_queue, worker_queue
             pass
 
         try:
-            result = execute_task(req['buffer'])
+            result = execute_task(import_buffer(req['buffer']))
             serialized_result = serialize(result, buffer_threshold=1e6)
         except Exception as e:
             logger.info('Caught an exception: {}'.format(e))
@@ -557,8 +613,8 @@ def worker(worker_id, pool_id, pool_size, task_queue, result_queue, worker_queue
                                         'exception': serialize(RemoteExceptionWrapper(*sys.exc_info()))
             })
 
-        result_queue.put(pkl_package)
-        tasks_in_progress.pop(worker_id)
+        result_queue.put(export_buffer(pkl_package, shared_memory_threshold))
+        tasks_in_progress[worker_id] = NO_TASK
 
 
 def start_file_logger(filename, rank, name='parsl', level=logging.DEBUG, format_string=None):
@@ -621,6 +677,9 @@ if __name__ == "__main__":
                         help="REQUIRED: Result port for posting results to the interchange")
     parser.add_argument("--cpu-affinity", type=str, choices=["none", "block", "alternating"],
                         help="Whether/how workers should control CPU affinity.")
+    parser.add_argument("--shm_threshold", default=None,
+                        help="Size in bytes from which task and result buffers are passed to workers through shared memory. "
+                        "Default: shared memory is not used")
 
     args = parser.parse_args()
 
@@ -648,6 +707,7 @@ if __name__ == "__main__":
         logger.info("Heartbeat threshold: {}".format(args.hb_threshold))
         logger.info("Heartbeat period: {}".format(args.hb_period))
         logger.info("CPU affinity: {}".format(args.cpu_affinity))
+        logger.info("Shared memory threshold: {}".format(args.shm_threshold))
 
         manager = Manager(task_port=args.task_port,
                           result_port=args.result_port,
@@ -662,7 +722,8 @@ if __name__ == "__main__":
                           heartbeat_threshold=int(args.hb_threshold),
                           heartbeat_period=int(args.hb_period),
                           poll_period=int(args.poll),
-                          cpu_affinity=args.cpu_affinity)
+                          cpu_affinity=args.cpu_affinity,
+                          shared_memory_threshold=None if args.shm_threshold is None else int(args.shm_threshold))
         manager.start()
 
     except Exception:
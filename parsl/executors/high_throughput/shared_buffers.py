@@ -0,0 +1,123 @@
+"""Pass large buffers between a manager and its worker processes through shared memory
+
+Tasks and results travel between the manager and its workers over multiprocessing
+queues, which pickle every buffer and copy it through a pipe. A buffer of at least
+the threshold size is instead copied once into a shared memory segment, and only a
+small :class:`SharedBuffer` reference goes through the queue. The process which
+receives the reference reads the buffer and unlinks the segment.
+
+Shared memory needs Python 3.8 or later. On older versions, or when a segment cannot
+be created, for instance because /dev/shm is full, buffers go through the queue as before.
+"""
+import logging
+import os
+import shutil
+import uuid
+
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:
+    shared_memory = None
+
+logger = logging.getLogger(__name__)
+
+# Where POSIX shared memory segments live on Linux
+SHM_DIR = "/dev/shm"
+
+
+class SharedBuffer(object):
+    """ Reference to a buffer held in a shared memory segment """
+
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+
+    def __repr__(self):
+        return "SharedBuffer({!r}, {})".format(self.name, self.size)
+
+
+def _untrack(shm):
+    # The segment is unlinked by the process which reads it, which is not the one which
+    # created it, so the resource tracker must not unlink it when its creator exits.
+    resource_tracker.unregister(shm._name, "shared_memory")
+
+
+def _has_room(size):
+    # Writing past the free space of a tmpfs kills the writer with SIGBUS rather than
+    # raising, so check for room before creating the segment.
+    if not os.path.isdir(SHM_DIR):
+        return True
+    return shutil.disk_usage(SHM_DIR).free >= size
+
+
+def task_segment_name(pool_id, task_id):
+    """ Name of the shared memory segment holding the buffer of a task sent to a worker pool """
+    return "parsl_{}_{}".format(pool_id, task_id)
+
+
+def export_buffer(buf, threshold, name=None):
+    """ Move a buffer into shared memory if it is large enough
+
+    Parameters
+    ----------
+    buf : bytes
+        The buffer to pass to another process
+
+    threshold : int
+        Size in bytes from which buffers are moved to shared memory. None disables shared memory.
+
+    name : str
+        Name of the shared memory segment. Default: None (meaning a random name)
+
+    Returns
+    -------
+    A :class:`SharedBuffer` referencing a copy of ``buf``, or ``buf`` itself.
+    """
+    if shared_memory is None or threshold is None or len(buf) < max(threshold, 1):
+        return buf
+    if not _has_room(len(buf)):
+        logger.warning("Not enough shared memory for a {} byte buffer, passing it through the queue".format(len(buf)))
+        return buf
+    if name is None:
+        name = "parsl_{}".format(uuid.uuid4().hex[:16])
+    try:
+        shm = shared_memory.SharedMemory(name=name, create=True, size=len(buf))
+    except OSError:
+        logger.warning("Failed to create a shared memory segment, passing the buffer through the queue", exc_info=True)
+        return buf
+    try:
+        _untrack(shm)
+        shm.buf[:len(buf)] = buf
+    finally:
+        shm.close()
+    return SharedBuffer(shm.name, len(buf))
+
+
+def import_buffer(obj):
+    """ Return the buffer passed by :func:`export_buffer`, unlinking its shared memory segment """
+    if not isinstance(obj, SharedBuffer):
+        return obj
+    shm = shared_memory.SharedMemory(name=obj.name)
+    try:
+        return bytes(shm.buf[:obj.size])
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def release_buffer(obj):
+    """ Unlink the shared memory segment of a buffer that will never be read """
+    if isinstance(obj, SharedBuffer):
+        release_segment(obj.name)
+
+
+def release_segment(name):
+    """ Unlink a shared memory segment by name, if it exists """
+    if shared_memory is None:
+        return
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
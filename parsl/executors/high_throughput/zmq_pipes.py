@@ -6,6 +6,8 @@ import pickle
 import logging
 import threading
 
+from parsl.executors.high_throughput.messages import encode_task_header
+
 logger = logging.getLogger(__name__)
 
 
@@ -103,10 +105,14 @@ class TasksOutgoing(object):
         self.poller = zmq.Poller()
         self.poller.register(self.zmq_socket, zmq.POLLOUT)
 
-    def put(self, message):
+    def put(self, task_id, buffer, priority=0):
         """ This function needs to be fast at the same time aware of the possibility of
         ZMQ pipes overflowing.
 
+        The task is sent as two frames, a header with the task_id and priority, and the
+        packed buffer, so that the interchange can forward the buffer to a manager without
+        unpickling it.
+
         The timeout increases slowly if contention is detected on ZMQ pipes.
         We could set copy=False and get slightly better latency but this results
         in ZMQ sockets reaching a broken state once there are ~10k tasks in flight.
@@ -117,7 +123,7 @@ class TasksOutgoing(object):
             socks = dict(self.poller.poll(timeout=timeout_ms))
             if self.zmq_socket in socks and socks[self.zmq_socket] == zmq.POLLOUT:
                 # The copy option adds latency but reduces the risk of ZMQ overflow
-                self.zmq_socket.send_pyobj(message, copy=True)
+                self.zmq_socket.send_multipart([encode_task_header(task_id, priority), buffer], copy=True)
                 return
             else:
                 timeout_ms += 1
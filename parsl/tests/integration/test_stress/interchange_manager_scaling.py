@@ -0,0 +1,169 @@
+"""
+What is this test
+=================
+
+This benchmark measures the CPU consumed by an otherwise idle HighThroughputExecutor
+interchange as the number of registered managers grows. With no tasks flowing, the
+interchange main loop is only doing housekeeping such as heartbeat expiry, so any
+growth of CPU with manager count is overhead paid on every poll period.
+
+
+How do we measure
+=================
+
+1. Start an interchange process, exactly as the HighThroughputExecutor does.
+2. Register ``N`` fake managers over ZMQ. The fake managers do not run any workers.
+3. Wait until the interchange reports all ``N`` managers over the command channel.
+4. Sample the user+system CPU time of the interchange process over ``duration`` seconds.
+
+Example::
+
+    python interchange_manager_scaling.py --managers 10,100,1000,4000 --duration 10
+
+Large manager counts need two file descriptors per manager in each of the benchmark
+and the interchange process; when the soft file descriptor limit is too low for the
+largest manager count, the benchmark raises it as far as the hard limit allows.
+
+
+Results
+=======
+
+Idle interchange CPU, in percent of one core, with the default 10ms poll period.
+Before is a full scan of every manager on each poll, after is the heartbeat
+deadline heap::
+
+      managers    before     after
+          1000       8.4       3.0
+          4000      18.6       2.8
+          8000      29.0       3.0
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import resource
+import sys
+import tempfile
+import time
+
+import psutil
+import zmq
+
+from parsl.version import VERSION as PARSL_VERSION
+from parsl.executors.high_throughput import interchange
+from parsl.executors.high_throughput import zmq_pipes
+from parsl.executors.high_throughput.messages import TASK_WIRE_VERSION
+
+
+def start_interchange(logdir, poll_period, heartbeat_threshold, port_range):
+    """Start an interchange process and the client side of its pipes"""
+    pipes = (zmq_pipes.TasksOutgoing("127.0.0.1", port_range),
+             zmq_pipes.ResultsIncoming("127.0.0.1", port_range),
+             zmq_pipes.CommandClient("127.0.0.1", port_range))
+
+    comm_q = multiprocessing.Queue(maxsize=10)
+    proc = multiprocessing.Process(target=interchange.starter,
+                                   args=(comm_q,),
+                                   kwargs={"client_ports": tuple(p.port for p in pipes),
+                                           "logdir": logdir,
+                                           "heartbeat_threshold": heartbeat_threshold,
+                                           "poll_period": poll_period},
+                                   daemon=True,
+                                   name="HTEX-Interchange")
+    proc.start()
+    try:
+        task_port, _ = comm_q.get(block=True, timeout=120)
+    except queue.Empty:
+        proc.terminate()
+        raise Exception("Interchange failed to start")
+    return proc, task_port, pipes
+
+
+def register_managers(context, task_port, count, block_size=100):
+    """Connect ``count`` fake managers to the interchange task port"""
+    sockets = []
+    for i in range(count):
+        uid = "bench-{}".format(i)
+        reg = {'parsl_v': PARSL_VERSION,
+               'python_v': "{}.{}.{}".format(*sys.version_info[:3]),
+               'wire_v': TASK_WIRE_VERSION,
+               'worker_count': 1,
+               'uid': uid,
+               'block_id': str(i // block_size),
+               'prefetch_capacity': 0,
+               'max_capacity': 1,
+               'os': platform.system(),
+               'hostname': platform.node(),
+               'dir': os.getcwd(),
+               'cpu_count': 1,
+               'total_memory': 0}
+        sock = context.socket(zmq.DEALER)
+        sock.setsockopt(zmq.IDENTITY, uid.encode('utf-8'))
+        sock.setsockopt(zmq.LINGER, 0)
+        sock.connect("tcp://127.0.0.1:{}".format(task_port))
+        sock.send(json.dumps(reg).encode('utf-8'))
+        sockets.append(sock)
+    return sockets
+
+
+def measure(manager_count, duration, poll_period, port_range):
+    """Return the interchange CPU utilisation, in percent of one core, with ``manager_count`` managers"""
+    with tempfile.TemporaryDirectory() as logdir:
+        proc, task_port, pipes = start_interchange(logdir, poll_period, heartbeat_threshold=3600, port_range=port_range)
+        command_client = pipes[2]
+        context = zmq.Context()
+        context.set(zmq.MAX_SOCKETS, manager_count + 16)
+        sockets = register_managers(context, task_port, manager_count)
+        try:
+            while len(command_client.run("MANAGERS")) < manager_count:
+                time.sleep(0.5)
+
+            ps = psutil.Process(proc.pid)
+            before = ps.cpu_times()
+            time.sleep(duration)
+            after = ps.cpu_times()
+        finally:
+            command_client.run("SHUTDOWN")
+            proc.join(timeout=10)
+            if proc.is_alive():
+                proc.terminate()
+            for sock in sockets:
+                sock.close()
+            context.term()
+            for pipe in pipes:
+                pipe.close()
+
+    cpu = (after.user - before.user) + (after.system - before.system)
+    return 100 * cpu / duration
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-m", "--managers", default="10,100,1000",
+                        help="Comma separated list of manager counts to measure")
+    parser.add_argument("-d", "--duration", type=float, default=10,
+                        help="Seconds over which CPU usage is sampled for each manager count")
+    parser.add_argument("-p", "--poll_period", type=int, default=10,
+                        help="Interchange poll period in milliseconds")
+    parser.add_argument("--port_range", default="55000,56000",
+                        help="Comma separated range of ports on which the client side of the interchange pipes listens")
+    args = parser.parse_args()
+
+    counts = [int(c) for c in args.managers.split(',')]
+    port_range = tuple(int(p) for p in args.port_range.split(','))
+
+    needed = 2 * max(counts) + 256
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != resource.RLIM_INFINITY and soft < needed:
+        if hard == resource.RLIM_INFINITY:
+            soft = needed
+        else:
+            soft = min(needed, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+
+    print("{:>10} {:>10}".format("managers", "cpu %"))
+    for count in counts:
+        print("{:>10} {:>10.2f}".format(count, measure(count, args.duration, args.poll_period, port_range)))
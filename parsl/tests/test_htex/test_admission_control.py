@@ -0,0 +1,76 @@
+import threading
+
+import pytest
+
+import parsl
+from parsl.app.app import python_app
+from parsl.executors.errors import ExecutorQueueFull
+from parsl.tests.configs.htex_local import fresh_config
+
+
+def local_setup():
+    config = fresh_config()
+    config.executors[0].max_outstanding_tasks = 2
+    config.executors[0].submit_timeout = 0
+    parsl.load(config)
+
+
+def local_teardown():
+    parsl.dfk().cleanup()
+    parsl.clear()
+
+
+@python_app
+def wait_for(path):
+    import os
+    import time
+    while not os.path.exists(path):
+        time.sleep(0.05)
+
+
+@python_app
+def noop():
+    pass
+
+
+@pytest.mark.local
+def test_queue_full_raises(tmp_path):
+    executor = parsl.dfk().executors['htex_local']
+    release = str(tmp_path / "release")
+
+    futures = [wait_for(release), wait_for(release)]
+    with pytest.raises(ExecutorQueueFull):
+        executor.submit(noop.func, {})
+
+    open(release, 'w').close()
+    [f.result() for f in futures]
+    executor.submit(noop.func, {}).result()
+
+
+@pytest.mark.local
+def test_submit_blocks_until_room(tmp_path):
+    executor = parsl.dfk().executors['htex_local']
+    release = str(tmp_path / "release")
+    executor.submit_timeout = None
+
+    futures = [wait_for(release), wait_for(release)]
+    submitted = threading.Event()
+
+    def submit():
+        futures.append(executor.submit(noop.func, {}))
+        submitted.set()
+
+    t = threading.Thread(target=submit, daemon=True)
+    t.start()
+    assert not submitted.wait(1)
+
+    open(release, 'w').close()
+    assert submitted.wait(30)
+    [f.result() for f in futures]
+    executor.submit_timeout = 0
+
+
+@pytest.mark.local
+def test_queue_stats():
+    stats = parsl.dfk().executors['htex_local'].queue_stats
+    assert stats == {'tasks': 0, 'bytes': 0}
@@ -0,0 +1,44 @@
+import heapq
+
+import pytest
+
+from parsl.executors.high_throughput.interchange import Interchange
+
+
+def make_interchange(heartbeat_threshold, last_heartbeats):
+    """Build an Interchange with just the heartbeat bookkeeping, and no sockets"""
+    ix = Interchange.__new__(Interchange)
+    ix.heartbeat_threshold = heartbeat_threshold
+    ix._ready_manager_queue = {m: {'last_heartbeat': t} for m, t in last_heartbeats.items()}
+    ix._heartbeat_deadlines = []
+    for m, t in last_heartbeats.items():
+        heapq.heappush(ix._heartbeat_deadlines, (t + heartbeat_threshold, m))
+    return ix
+
+
+@pytest.mark.local
+def test_heartbeat_since_deadline_is_repushed():
+    ix = make_interchange(10, {b'a': 0})
+    ix._ready_manager_queue[b'a']['last_heartbeat'] = 5
+
+    assert ix._expired_managers(now=12) == []
+    assert ix._heartbeat_deadlines == [(15, b'a')]
+    assert ix._expired_managers(now=16) == [b'a']
+
+
+@pytest.mark.local
+def test_removed_manager_is_skipped():
+    ix = make_interchange(10, {b'a': 0, b'b': 1})
+    ix._ready_manager_queue.pop(b'a')
+
+    assert ix._expired_managers(now=20) == [b'b']
+    assert ix._heartbeat_deadlines == []
+
+
+@pytest.mark.local
+def test_expired_manager_reported_once():
+    ix = make_interchange(10, {b'a': 0, b'b': 100})
+
+    assert ix._expired_managers(now=11) == [b'a']
+    assert ix._expired_managers(now=12) == []
+    assert ix._heartbeat_deadlines == [(110, b'b')]
@@ -0,0 +1,46 @@
+import pytest
+
+import parsl
+from parsl.app.app import python_app
+from parsl.tests.configs.htex_local import fresh_config
+
+
+def local_setup():
+    parsl.load(fresh_config())
+
+
+def local_teardown():
+    parsl.dfk().cleanup()
+    parsl.clear()
+
+
+@python_app
+def checksum(buf):
+    import hashlib
+    return len(buf), hashlib.md5(buf).hexdigest()
+
+
+@python_app
+def make_payload(size):
+    import os
+    return os.urandom(size)
+
+
+@pytest.mark.local
+@pytest.mark.parametrize("size_mb", [1, 16])
+def test_large_payload_round_trip(size_mb):
+    """Multi-MB arguments travel through the interchange intact"""
+    import hashlib
+    import os
+
+    bufs = [os.urandom(size_mb * 2 ** 20) for _ in range(4)]
+    futures = [checksum(b) for b in bufs]
+    for b, f in zip(bufs, futures):
+        assert f.result() == (len(b), hashlib.md5(b).hexdigest())
+
+
+@pytest.mark.local
+def test_large_result_round_trip():
+    """Multi-MB results travel back through the interchange intact"""
+    futures = [make_payload(size) for size in [10, 2 ** 21, 2 ** 24]]
+    assert [len(f.result()) for f in futures] == [10, 2 ** 21, 2 ** 24]
@@ -0,0 +1,63 @@
+import pytest
+
+import parsl
+from parsl.app.app import python_app
+from parsl.executors.high_throughput.manager_selector import (LeastLoadedManagerSelector, PackingManagerSelector,
+                                                              RandomManagerSelector, RoundRobinManagerSelector)
+from parsl.tests.configs.htex_local import fresh_config
+
+
+def local_setup():
+    config = fresh_config()
+    config.executors[0].manager_selector = PackingManagerSelector()
+    parsl.load(config)
+
+
+def local_teardown():
+    parsl.dfk().cleanup()
+    parsl.clear()
+
+
+def make_managers(layout):
+    """Build manager records from {manager: (block_id, tasks in flight)}"""
+    return {m: {'block_id': block_id, 'tasks': dict.fromkeys(range(n), 0.0)}
+            for m, (block_id, n) in layout.items()}
+
+
+@python_app
+def double(x):
+    return 2 * x
+
+
+@pytest.mark.local
+def test_random():
+    managers = make_managers({b'a': ('0', 0), b'b': ('0', 1), b'c': ('1', 2)})
+    assert sorted(RandomManagerSelector().sort_managers(managers, {b'a', b'c'})) == [b'a', b'c']
+
+
+@pytest.mark.local
+def test_least_loaded():
+    managers = make_managers({b'a': ('0', 3), b'b': ('0', 1), b'c': ('1', 2)})
+    assert LeastLoadedManagerSelector().sort_managers(managers, set(managers)) == [b'b', b'c', b'a']
+
+
+@pytest.mark.local
+def test_round_robin():
+    managers = make_managers({b'a': ('0', 0), b'b': ('0', 0), b'c': ('1', 0)})
+    selector = RoundRobinManagerSelector()
+    assert selector.sort_managers(managers, set(managers)) == [b'a', b'b', b'c']
+    assert selector.sort_managers(managers, set(managers)) == [b'b', b'c', b'a']
+    assert selector.sort_managers(managers, {b'a', b'b'}) == [b'a', b'b']
+
+
+@pytest.mark.local
+def test_packing():
+    """Busiest block first, then busiest manager within the block"""
+    managers = make_managers({b'a': ('0', 1), b'b': ('1', 2), b'c': ('1', 0), b'd': ('2', 0)})
+    assert PackingManagerSelector().sort_managers(managers, {b'a', b'c', b'd'}) == [b'c', b'a', b'd']
+
+
+@pytest.mark.local
+def test_packing_executor():
+    """Tasks complete with a non-default selector"""
+    assert [f.result() for f in [double(i) for i in range(20)]] == [2 * i for i in range(20)]
@@ -0,0 +1,81 @@
+import pytest
+
+import parsl
+from parsl.app.app import python_app
+from parsl.tests.configs.htex_local import fresh_config
+
+
+def local_setup():
+    parsl.load(fresh_config())
+
+
+def local_teardown():
+    parsl.dfk().cleanup()
+    parsl.clear()
+
+
+@python_app
+def noop():
+    pass
+
+
+@pytest.mark.local
+def test_manager_task_latency():
+    """Completed tasks are accounted against the manager which ran them"""
+    n = 10
+    [f.result() for f in [noop() for _ in range(n)]]
+
+    managers = parsl.dfk().executors['htex_local'].connected_managers
+    assert sum(m['tasks_completed'] for m in managers) == n
+    assert sum(m['tasks'] for m in managers) == 0
+
+    for m in managers:
+        if m['tasks_completed']:
+            assert 0 < m['mean_task_latency'] <= m['max_task_latency']
+        else:
+            assert m['mean_task_latency'] is None
+
+
+def make_interchange(tasks):
+    """Build an Interchange with a single manager record, and no sockets"""
+    from parsl.executors.high_throughput.interchange import Interchange
+    ix = Interchange.__new__(Interchange)
+    ix._ready_manager_queue = {b'manager': {'tasks': dict(tasks),
+                                            'tasks_completed': 0,
+                                            'total_task_latency': 0.0,
+                                            'max_task_latency': 0.0}}
+    return ix
+
+
+@pytest.mark.local
+def test_record_task_latency():
+    ix = make_interchange({})
+    for latency in [0.5, 2.0, 1.0]:
+        ix._record_task_latency(b'manager', latency)
+
+    m = ix._ready_manager_queue[b'manager']
+    assert m['tasks_completed'] == 3
+    assert m['total_task_latency'] == 3.5
+    assert m['max_task_latency'] == 2.0
+
+
+@pytest.mark.local
+def test_task_completed():
+    ix = make_interchange({1: 10.0, 2: 11.0})
+    ix._task_completed(b'manager', 1, received_time=13.0)
+
+    m = ix._ready_manager_queue[b'manager']
+    assert m['tasks'] == {2: 11.0}
+    assert m['tasks_completed'] == 1
+    assert m['max_task_latency'] == 3.0
+
+
+@pytest.mark.local
+def test_task_completed_unknown_task():
+    """A result for a task that is not in flight on the manager is ignored"""
+    ix = make_interchange({2: 11.0})
+    ix._task_completed(b'manager', 1, received_time=13.0)
+
+    m = ix._ready_manager_queue[b'manager']
+    assert m['tasks'] == {2: 11.0}
+    assert m['tasks_completed'] == 0
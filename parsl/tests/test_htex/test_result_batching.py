@@ -0,0 +1,97 @@
+import pytest
+
+import parsl
+from parsl.app.app import python_app
+from parsl.executors.high_throughput.interchange import Interchange
+from parsl.tests.configs.htex_local import fresh_config
+
+
+def local_setup():
+    config = fresh_config()
+    config.executors[0].result_batch_size = 8
+    config.executors[0].result_batch_period = 50
+    parsl.load(config)
+
+
+def local_teardown():
+    parsl.dfk().cleanup()
+    parsl.clear()
+
+
+class RecordingSocket:
+    def __init__(self):
+        self.sent = []
+
+    def send_multipart(self, frames):
+        self.sent.append(list(frames))
+
+
+def make_interchange(result_batch_size, result_batch_period):
+    """Build an Interchange with just the result batching state, and no sockets"""
+    ix = Interchange.__new__(Interchange)
+    ix.result_batch_size = result_batch_size
+    ix.result_batch_period = result_batch_period
+    ix.results_outgoing = RecordingSocket()
+    ix._pending_results = []
+    ix._pending_results_since = None
+    return ix
+
+
+def hold(ix, now, *messages):
+    if not ix._pending_results:
+        ix._pending_results_since = now
+    ix._pending_results.extend(messages)
+
+
+@pytest.mark.local
+def test_unbatched_results_forwarded_immediately():
+    ix = make_interchange(1, 0)
+    hold(ix, 100.0, b'a', b'b')
+    ix._forward_results(100.0)
+    assert ix.results_outgoing.sent == [[b'a', b'b']]
+    assert ix._poll_timeout(10, 100.0) == 10
+
+
+@pytest.mark.local
+def test_results_forwarded_when_batch_full():
+    ix = make_interchange(3, 1000)
+    hold(ix, 100.0, b'a', b'b')
+    ix._forward_results(100.0)
+    assert ix.results_outgoing.sent == []
+    hold(ix, 100.1, b'c')
+    ix._forward_results(100.1)
+    assert ix.results_outgoing.sent == [[b'a', b'b', b'c']]
+    assert ix._pending_results == []
+
+
+@pytest.mark.local
+def test_results_forwarded_when_period_expires():
+    ix = make_interchange(100, 20)
+    hold(ix, 100.0, b'a')
+    assert ix._poll_timeout(10, 100.015) == pytest.approx(5)
+    ix._forward_results(100.015)
+    assert ix.results_outgoing.sent == []
+    ix._forward_results(100.021)
+    assert ix.results_outgoing.sent == [[b'a']]
+    assert ix._poll_timeout(10, 100.021) == 10
+
+
+@pytest.mark.local
+def test_flush_forwards_pending_results():
+    ix = make_interchange(100, 1000)
+    ix._forward_results(100.0, flush=True)
+    assert ix.results_outgoing.sent == []
+    hold(ix, 100.0, b'a')
+    ix._forward_results(100.0, flush=True)
+    assert ix.results_outgoing.sent == [[b'a']]
+
+
+@python_app
+def double(x):
+    return 2 * x
+
+
+@pytest.mark.local
+def test_batched_results(n=50):
+    futures = [double(i) for i in range(n)]
+    assert [f.result() for f in futures] == [2 * i for i in range(n)]
@@ -0,0 +1,63 @@
+import os
+
+import pytest
+
+from parsl.executors.high_throughput import shared_buffers
+from parsl.executors.high_throughput.shared_buffers import (SharedBuffer, export_buffer, import_buffer, release_buffer,
+                                                            release_segment, task_segment_name)
+
+requires_shared_memory = pytest.mark.skipif(shared_buffers.shared_memory is None,
+                                            reason="shared memory needs Python 3.8 or later")
+
+
+def segment_exists(ref):
+    return os.path.exists(os.path.join(shared_buffers.SHM_DIR, ref.name))
+
+
+@pytest.mark.local
+def test_small_buffers_are_not_exported():
+    assert export_buffer(b'abc', 4) == b'abc'
+    assert export_buffer(b'abc', None) == b'abc'
+    assert import_buffer(b'abc') == b'abc'
+    release_buffer(b'abc')
+
+
+@requires_shared_memory
+@pytest.mark.local
+def test_export_import_round_trip():
+    buf = os.urandom(2 ** 20)
+    ref = export_buffer(buf, 1024)
+    assert isinstance(ref, SharedBuffer)
+    assert ref.size == len(buf)
+    assert import_buffer(ref) == buf
+    assert not segment_exists(ref)
+
+
+@requires_shared_memory
+@pytest.mark.local
+def test_release_unread_buffer():
+    ref = export_buffer(b'x' * 4096, 1024)
+    assert segment_exists(ref)
+    release_buffer(ref)
+    assert not segment_exists(ref)
+    # Releasing a buffer that has already been read or released is harmless
+    release_buffer(ref)
+
+
+@requires_shared_memory
+@pytest.mark.local
+def test_release_task_segment_by_name():
+    """The watchdog only knows the task id of a lost task, and releases its buffer by name"""
+    ref = export_buffer(b'x' * 4096, 1024, name=task_segment_name('pool', 7))
+    assert ref.name == task_segment_name('pool', 7)
+    release_segment(task_segment_name('pool', 7))
+    assert not segment_exists(ref)
+    release_segment(task_segment_name('pool', 8))
+
+
+@requires_shared_memory
+@pytest.mark.local
+def test_falls_back_without_room(monkeypatch):
+    monkeypatch.setattr(shared_buffers, "_has_room", lambda size: False)
+    buf = b'x' * 4096
+    assert export_buffer(buf, 1024) is buf
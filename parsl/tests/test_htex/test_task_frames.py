@@ -0,0 +1,129 @@
+import pickle
+import threading
+import time
+
+import pytest
+import zmq
+
+from parsl.executors.high_throughput import zmq_pipes
+from parsl.executors.high_throughput.interchange import Interchange, PKL_HEARTBEAT_CODE, HEARTBEAT_CODE
+from parsl.executors.high_throughput.messages import (TASK_ID_WIDTH, decode_task_header, decode_task_id,
+                                                      encode_task_header, encode_task_id,
+                                                      pack_task_frames, unpack_task_frames)
+
+
+@pytest.mark.local
+def test_task_id_encoding():
+    for task_id in [0, 1, 2 ** 16 + 1, 2 ** 32 + 7, 2 ** 63]:
+        frame = encode_task_id(task_id)
+        assert len(frame) == TASK_ID_WIDTH
+        assert decode_task_id(frame) == task_id
+        assert decode_task_id(memoryview(frame)) == task_id
+
+
+@pytest.mark.local
+def test_task_header_encoding():
+    for task_id, priority in [(0, 0), (2 ** 40, 5), (3, -2 ** 63), (2 ** 64 - 1, 2 ** 63 - 1)]:
+        assert decode_task_header(encode_task_header(task_id, priority)) == (task_id, priority)
+    assert decode_task_header(encode_task_header(9)) == (9, 0)
+
+
+@pytest.mark.local
+def test_unpack_control_frame():
+    assert unpack_task_frames([pickle.dumps('STOP')]) == 'STOP'
+    assert unpack_task_frames([PKL_HEARTBEAT_CODE]) == HEARTBEAT_CODE
+
+
+@pytest.mark.local
+def test_unpack_task_batch():
+    tasks = [{'task_id': tid, 'buffer': 'task {}'.format(tid).encode()} for tid in [3, 2 ** 16 + 5, 2 ** 40]]
+    assert unpack_task_frames(pack_task_frames(tasks)) == tasks
+
+
+@pytest.mark.local
+def test_unpack_unpaired_frames():
+    with pytest.raises(ValueError):
+        unpack_task_frames([encode_task_id(1), b'buf', encode_task_id(2)])
+
+
+@pytest.fixture
+def interchange(tmp_path):
+    port_range = (55000, 56000)
+    pipes = (zmq_pipes.TasksOutgoing("127.0.0.1", port_range),
+             zmq_pipes.ResultsIncoming("127.0.0.1", port_range),
+             zmq_pipes.CommandClient("127.0.0.1", port_range))
+    ix = Interchange(client_ports=tuple(p.port for p in pipes), logdir=str(tmp_path))
+    kill_event = threading.Event()
+    thread = threading.Thread(target=ix.migrate_tasks_to_internal, args=(kill_event,), daemon=True)
+    thread.start()
+
+    yield ix, pipes[0], thread, kill_event
+
+    kill_event.set()
+    thread.join()
+    ix.context.destroy(linger=0)
+    for p in pipes:
+        p.close()
+
+
+@pytest.mark.local
+def test_interchange_round_trip(interchange):
+    """Tasks put by the client reach a manager unchanged, several per dispatch"""
+    ix, outgoing, _, _ = interchange
+    submitted = {2 ** 33 + i: "payload {}".format(i).encode() * 1000 for i in range(5)}
+    for tid, buf in submitted.items():
+        outgoing.put(tid, buf)
+    # The malformed message is dropped and the pull thread carries on
+    outgoing.zmq_socket.send_multipart([encode_task_id(1), b'a', b'b'])
+    outgoing.zmq_socket.send_multipart([encode_task_id(1), b'a'])
+    outgoing.put(7, b'last')
+
+    tasks = []
+    deadline = time.time() + 10
+    while len(tasks) < len(submitted) + 1 and time.time() < deadline:
+        tasks.extend(ix.get_tasks(10))
+
+    manager = ix.context.socket(zmq.DEALER)
+    manager.setsockopt(zmq.IDENTITY, b'manager')
+    manager.setsockopt(zmq.LINGER, 0)
+    manager.connect("tcp://127.0.0.1:{}".format(ix.worker_task_port))
+    # Routing to the manager only works once its connection is known to the ROUTER
+    manager.send(b'hello')
+    ix.task_outgoing.recv_multipart()
+
+    ix.task_outgoing.send_multipart([b'manager', b''] + pack_task_frames(tasks), copy=False)
+    _, *frames = manager.recv_multipart()
+    received = unpack_task_frames(frames)
+    assert {t['task_id']: t['buffer'] for t in received} == {**submitted, 7: b'last'}
+
+    ix.task_outgoing.send_multipart([b'manager', b'', PKL_HEARTBEAT_CODE])
+    _, *frames = manager.recv_multipart()
+    assert unpack_task_frames(frames) == HEARTBEAT_CODE
+    manager.close()
+
+
+@pytest.mark.local
+def test_interchange_priority_order(interchange):
+    """Pending tasks are handed out highest priority first, then in arrival order"""
+    ix, outgoing, _, _ = interchange
+    submitted = [(1, 0), (2, 5), (3, -1), (4, 5), (5, 0), (6, 10)]
+    for tid, priority in submitted:
+        outgoing.put(tid, b'x', priority)
+
+    tasks = []
+    deadline = time.time() + 10
+    while ix.pending_task_queue.qsize() < len(submitted) and time.time() < deadline:
+        time.sleep(0.01)
+    while len(tasks) < len(submitted) and time.time() < deadline:
+        tasks.extend(ix.get_tasks(10))
+    assert [t['task_id'] for t in tasks] == [6, 2, 4, 1, 5, 3]
+
+
+@pytest.mark.local
+def test_interchange_stop(interchange):
+    """A single pickled STOP frame from the client stops the task pull thread"""
+    ix, outgoing, thread, kill_event = interchange
+    outgoing.zmq_socket.send_pyobj('STOP')
+    thread.join(timeout=10)
+    assert not thread.is_alive()
+    assert kill_event.is_set()
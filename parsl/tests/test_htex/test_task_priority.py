@@ -0,0 +1,58 @@
+import pytest
+
+import parsl
+from parsl.app.app import python_app
+from parsl.dataflow.dflow import DataFlowKernel
+from parsl.executors.errors import UnsupportedFeatureError
+from parsl.tests.configs.htex_local import fresh_config
+
+
+def local_setup():
+    config = fresh_config()
+    config.depth_priority = True
+    parsl.load(config)
+
+
+def local_teardown():
+    parsl.dfk().cleanup()
+    parsl.clear()
+
+
+@python_app
+def inc(x, parsl_resource_specification={}):
+    return x + 1
+
+
+@pytest.mark.local
+def test_priority_resource_specification():
+    futures = [inc(i, parsl_resource_specification={'priority': i}) for i in range(-2, 3)]
+    assert [f.result() for f in futures] == [-1, 0, 1, 2, 3]
+
+
+@pytest.mark.local
+def test_other_resource_specification_rejected():
+    with pytest.raises(UnsupportedFeatureError):
+        inc(1, parsl_resource_specification={'priority': 1, 'cores': 2}).result()
+
+
+@pytest.mark.local
+def test_invalid_priority_rejected():
+    with pytest.raises(ValueError):
+        inc(1, parsl_resource_specification={'priority': 'high'}).result()
+
+
+@pytest.mark.local
+def test_depth_priority_chain():
+    a = inc(0)
+    b = inc(a)
+    c = inc(inc(b))
+    assert c.result() == 4
+    assert [f.task_def['depth'] for f in (a, b, c)] == [0, 1, 3]
+
+
+@pytest.mark.local
+def test_task_depth():
+    shallow, deep = inc(0), inc(inc(0))
+    deep.result()
+    assert DataFlowKernel._task_depth([]) == 0
+    assert DataFlowKernel._task_depth([shallow, deep]) == 2